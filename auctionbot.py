@@ -1,8 +1,10 @@
+import asyncio
 import discord
 from discord.ext import commands, tasks
-from datetime import datetime, timedelta
+from datetime import timedelta
 import re
 import os
+import time
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -10,34 +12,101 @@ load_dotenv()
 TOKEN = os.getenv('DISCORD_TOKEN')
 AUCTION_RESULTS_CHANNEL_ID = int(os.getenv('AUCTION_RESULTS_CHANNEL_ID', 0))
 
+# Precompiled patterns for the hot !bid / !auction parsing paths
+_BID_RE = re.compile(r'^(\d+)([mgps])$')
+_DUR_RE = re.compile(r'^(\d+)([mh])$')
+
+# Single-pass detector for bid-looking messages that should be deleted
+# from silent-auction channels
+_BIDLIKE_RE = re.compile(r'^!bid|[mgps]\s|plat|gold|silver|mith', re.IGNORECASE)
+
+# Currency name/abbreviation aliases, longest-first so e.g. 'mith'
+# can't swallow the start of 'mithril'
+_ALIASES = {
+    'mithril': 'm', 'mith': 'm',
+    'platinum': 'p', 'plat': 'p',
+    'gold': 'g',
+    'silver': 's', 'sil': 's'
+}
+_ALIAS_RE = re.compile('|'.join(sorted(_ALIASES, key=len, reverse=True)))
+
+# Silver value of one unit of each denomination
+_MULTIPLIERS = {
+    'm': 1000000,
+    'p': 10000,
+    'g': 100,
+    's': 1
+}
+
+_SEP = "━━━━━━━━━━━━━━━━━━━━━━━━"
+
+# Static tail of the auction-start announcement; only the item and
+# duration lines change per auction
+_AUCTION_INSTRUCTIONS = (
+    "",
+    "**💰 How to Bid:**",
+    "Type `!bid` followed by your amount:",
+    "",
+    "**Mithril**",
+    "• `!bid 1m` or `1mith` or `1mithril`",
+    "",
+    "**Platinum**",
+    "• `!bid 50p` or `50plat` or `50platinum`",
+    "",
+    "**Gold**",
+    "• `!bid 100g` or `100gold`",
+    "",
+    "**Silver**",
+    "• `!bid 500s` or `500sil` or `500silver`",
+    "",
+    "**Mix Currencies:**",
+    "• `!bid 1m 50p 100g 500s`",
+    "",
+    "**🔔 Rules:**",
+    "• Silent auction - bids are private",
+    "• Bid confirmations sent via DM",
+    "• 15s extension when outbid"
+)
+
 class AuctionBot(commands.Bot):
     def __init__(self):
         intents = discord.Intents.default()
         intents.message_content = True
         super().__init__(command_prefix='!', intents=intents)
         self.active_auctions = {}
+        self._forbidden_dm: set[int] = set()
+        self._bg_tasks: set = set()  # Keeps fire-and-forget tasks alive until done
 
     async def setup_hook(self):
         """Initialize bot settings and start background tasks"""
         await self.add_cog(Auction(self))  # Load cog during setup
-        self.check_auctions.start()
+        self.clear_forbidden_dms.start()
+
+    @tasks.loop(hours=1)
+    async def clear_forbidden_dms(self):
+        """Forget known-forbidden DM targets so they get retried eventually"""
+        self._forbidden_dm.clear()
 
     async def on_ready(self):
         """Called when the bot is ready to start receiving events"""
         print(f"{self.user} has connected to Discord!")
 
-    @tasks.loop(seconds=1)
-    async def check_auctions(self):
-        """Check for ended auctions and process them"""
-        current_time = datetime.now()
-        ended_auctions = [(channel_id, auction) 
-                         for channel_id, auction in list(self.active_auctions.items())  # Create a copy to avoid modification during iteration
-                         if current_time >= auction['end_time']]
-        
-        for channel_id, auction in ended_auctions:
-            if channel_id in self.active_auctions:  # Double check it's still active
-                await self.process_auction_end(channel_id, auction)
-                del self.active_auctions[channel_id]
+    def schedule_auction_end(self, channel_id: int, auction: dict, delay: float):
+        """Schedule (or reschedule) the end-of-auction timer for an auction"""
+        if auction['timer']:
+            auction['timer'].cancel()
+        auction['timer'] = self.loop.call_later(delay, self._spawn_auction_end, channel_id)
+
+    def _spawn_auction_end(self, channel_id: int):
+        """Run end_auction in the background, keeping the task alive until done"""
+        task = asyncio.create_task(self.end_auction(channel_id))
+        self._bg_tasks.add(task)
+        task.add_done_callback(self._bg_tasks.discard)
+
+    async def end_auction(self, channel_id: int):
+        """Finalize an auction when its end timer fires"""
+        if auction := self.active_auctions.pop(channel_id, None):
+            await self.process_auction_end(channel_id, auction)
 
     async def process_auction_end(self, channel_id: int, auction: dict):
         """Process an ended auction and announce results"""
@@ -45,32 +114,35 @@ class AuctionBot(commands.Bot):
         if not channel:
             return
 
-        if not auction['bids']:
+        winner_id, winning_bid = auction['highest_bidder'], auction['highest_bid']
+        if winner_id is None:
             await self.send_no_bids_message(channel, auction['item'])
             return
 
-        winner_id, winning_bid = max(auction['bids'].items(), key=lambda x: x[1])
         winner = channel.guild.get_member(winner_id)
         if winner:
             await self.send_winner_messages(channel, auction['item'], winner, winning_bid)
 
     async def send_formatted_message(self, destination, header: str, header_color: str, content: list, footer: list = None):
         """Send a formatted message with consistent styling"""
-        message = [
-            "```ansi",
-            f"\u001b[1;{header_color}m{header}\u001b[0m",
-            "```",
-            "━━━━━━━━━━━━━━━━━━━━━━━━"
-        ]
-        message.extend(content)
-        message.append("━━━━━━━━━━━━━━━━━━━━━━━━")
+        # Skip DM targets that recently refused us - no point paying the
+        # round-trip just to get another 403. Channels are exempt: a transient
+        # permission hiccup there shouldn't mute announcements for an hour
+        is_dm_target = isinstance(destination, (discord.Member, discord.User, discord.DMChannel))
+        if is_dm_target and destination.id in self._forbidden_dm:
+            return
+
+        body = content if isinstance(content, str) else '\n'.join(content)
+        message = (f"```ansi\n\u001b[1;{header_color}m{header}\u001b[0m\n```\n"
+                   f"{_SEP}\n{body}\n{_SEP}")
         if footer:
-            message.extend(footer)
-        
+            message += '\n' + '\n'.join(footer)
+
         try:
-            await destination.send('\n'.join(message))
+            await destination.send(message)
         except discord.Forbidden:
-            pass
+            if is_dm_target:
+                self._forbidden_dm.add(destination.id)
 
     async def send_no_bids_message(self, channel, item: str):
         """Send message for auction with no bids"""
@@ -78,10 +150,12 @@ class AuctionBot(commands.Bot):
             f"📦 **Item:** `{item}`",
             "❌ **Result:** No bids were placed."
         ]
-        await self.send_formatted_message(channel, "🏁 AUCTION ENDED! 🏁", "31", content)
-        
+        sends = [self.send_formatted_message(channel, "🏁 AUCTION ENDED! 🏁", "31", content)]
+
         if results_channel := channel.guild.get_channel(AUCTION_RESULTS_CHANNEL_ID):
-            await self.send_formatted_message(results_channel, "🏁 AUCTION ENDED! 🏁", "31", content)
+            sends.append(self.send_formatted_message(results_channel, "🏁 AUCTION ENDED! 🏁", "31", content))
+
+        await asyncio.gather(*sends, return_exceptions=True)
 
     async def send_winner_messages(self, channel, item: str, winner: discord.Member, winning_bid):
         """Send winner announcement messages"""
@@ -90,12 +164,6 @@ class AuctionBot(commands.Bot):
             f"📦 **Item:** `{item}`",
             f"👑 **Winner:** `{winner.display_name}`"
         ]
-        await self.send_formatted_message(channel, "🎉 AUCTION ENDED! 🎉", "32", public_content)
-
-        # Results channel message (with bid amount)
-        if results_channel := channel.guild.get_channel(AUCTION_RESULTS_CHANNEL_ID):
-            results_content = public_content + [f"💰 **Winning Bid:** `{winning_bid}`"]
-            await self.send_formatted_message(results_channel, "🎉 AUCTION ENDED! 🎉", "32", results_content)
 
         # Winner DM
         winner_content = [
@@ -103,13 +171,21 @@ class AuctionBot(commands.Bot):
             f"📦 **Item:** `{item}`",
             f"💰 **Your winning bid:** `{winning_bid}`"
         ]
-        await self.send_formatted_message(winner, "🎊 CONGRATULATIONS! 🎊", "33", winner_content)
 
-    async def send_bid_confirmation(self, destination, item: str, bid_amount: int, denomination: str, channel_id: int):
+        sends = [
+            self.send_formatted_message(channel, "🎉 AUCTION ENDED! 🎉", "32", public_content),
+            self.send_formatted_message(winner, "🎊 CONGRATULATIONS! 🎊", "33", winner_content)
+        ]
+
+        # Results channel message (with bid amount)
+        if results_channel := channel.guild.get_channel(AUCTION_RESULTS_CHANNEL_ID):
+            results_content = public_content + [f"💰 **Winning Bid:** `{winning_bid}`"]
+            sends.append(self.send_formatted_message(results_channel, "🎉 AUCTION ENDED! 🎉", "32", results_content))
+
+        await asyncio.gather(*sends, return_exceptions=True)
+
+    async def send_bid_confirmation(self, destination, item: str, denomination: str, is_highest: bool):
         """Send bid confirmation message"""
-        current_bids = self.active_auctions[channel_id]['bids'].values()
-        is_highest = not current_bids or bid_amount > max(current_bids)
-        
         confirm_content = [
             f"📦 **Item:** `{item}`",
             f"💰 **Your bid:** `{denomination}`",
@@ -127,14 +203,32 @@ class Auction(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
+    @staticmethod
+    async def _delete_quietly(message):
+        """Delete a message, ignoring missing permissions or already-gone messages"""
+        try:
+            await message.delete()
+        except (discord.Forbidden, discord.NotFound):
+            pass
+
+    def _spawn_delete(self, message):
+        """Run _delete_quietly in the background, keeping the task alive until done"""
+        task = asyncio.create_task(self._delete_quietly(message))
+        self.bot._bg_tasks.add(task)
+        task.add_done_callback(self.bot._bg_tasks.discard)
+
     @commands.Cog.listener()
     async def on_message(self, message):
         """Delete any messages that look like bids to maintain auction privacy"""
         if message.author.bot or message.channel.id not in self.bot.active_auctions:
             return
 
-        content = message.content.lower()
-        if content.startswith('!bid') or any(x in content for x in ['p ', 'g ', 's ', 'm ', 'plat', 'gold', 'silver', 'mith']):
+        # Fast-reject ordinary chatter: bid-like messages start with '!' or an amount
+        raw = message.content
+        if not raw or raw[0] not in '!0123456789':
+            return
+
+        if _BIDLIKE_RE.search(raw):
             try:
                 await message.delete()
             except (discord.Forbidden, discord.NotFound):
@@ -143,10 +237,8 @@ class Auction(commands.Cog):
     @commands.command(name='auction')
     async def start_auction(self, ctx, item: str, duration: str):
         """Start a new auction"""
-        try:
-            await ctx.message.delete()
-        except (discord.Forbidden, discord.NotFound):
-            pass
+        # Let the delete overlap with the rest of the command
+        self._spawn_delete(ctx.message)
 
         if ctx.channel.id in self.bot.active_auctions:
             await ctx.author.send("❌ An auction is already running in this channel!")
@@ -156,60 +248,41 @@ class Auction(commands.Cog):
             await ctx.author.send("❌ Invalid duration format. Use: `5m` for 5 minutes or `2h` for 2 hours")
             return
 
-        end_time = datetime.now() + max(duration_delta, timedelta(seconds=10))
-        
-        self.bot.active_auctions[ctx.channel.id] = {
+        duration_seconds = max(duration_delta.total_seconds(), 10)
+
+        auction = {
             'item': item,
-            'end_time': end_time,
-            'bids': {}
+            'end_monotonic': time.monotonic() + duration_seconds,
+            'bids': {},
+            'bidder_objs': {},
+            'highest_bid': 0,
+            'highest_bidder': None,
+            'timer': None
         }
+        self.bot.active_auctions[ctx.channel.id] = auction
+        self.bot.schedule_auction_end(ctx.channel.id, auction, duration_seconds)
 
         content = [
             f"📦 **Item:** `{item}`",
             f"⏳ **Duration:** `{duration}`",
-            "",
-            "**💰 How to Bid:**",
-            "Type `!bid` followed by your amount:",
-            "",
-            "**Mithril**",
-            "• `!bid 1m` or `1mith` or `1mithril`",
-            "",
-            "**Platinum**",
-            "• `!bid 50p` or `50plat` or `50platinum`",
-            "",
-            "**Gold**",
-            "• `!bid 100g` or `100gold`",
-            "",
-            "**Silver**",
-            "• `!bid 500s` or `500sil` or `500silver`",
-            "",
-            "**Mix Currencies:**",
-            "• `!bid 1m 50p 100g 500s`",
-            "",
-            "**🔔 Rules:**",
-            "• Silent auction - bids are private",
-            "• Bid confirmations sent via DM",
-            "• 15s extension when outbid"
+            *_AUCTION_INSTRUCTIONS
         ]
-        
+
         await self.bot.send_formatted_message(ctx, "🔨 SILENT AUCTION STARTED! 🔨", "33", content)
 
     @commands.command(name='bid')
     async def place_bid(self, ctx, *, bid: str):
         """Place a bid in the current auction"""
-        try:
-            await ctx.message.delete()
-        except (discord.Forbidden, discord.NotFound):
-            pass
+        # Let the delete overlap with bid validation and the DM round-trips
+        self._spawn_delete(ctx.message)
 
         if ctx.channel.id not in self.bot.active_auctions:
             await ctx.author.send("❌ No active auction in this channel!")
             return
 
+        # The end timer removes finished auctions from active_auctions, so the
+        # membership check above already guarantees this auction is live
         auction = self.bot.active_auctions[ctx.channel.id]
-        if datetime.now() >= auction['end_time']:
-            await ctx.author.send("❌ This auction has ended!")
-            return
 
         # Validate bid format and parse amount
         if not (result := parse_bid(bid)):
@@ -240,76 +313,63 @@ class Auction(commands.Cog):
             await ctx.author.send("❌ Your new bid must be higher than your previous bid!")
             return
 
-        highest_bid = max(auction['bids'].values()) if auction['bids'] else 0
-        if bid_amount <= highest_bid:
+        if bid_amount <= auction['highest_bid']:
             await ctx.author.send("❌ Your bid must be higher than the current highest bid!")
             return
 
         # Check for auction extension
-        time_remaining = auction['end_time'] - datetime.now()
-        current_highest_bidder = None
-        if auction['bids']:
-            current_highest_bidder = max(auction['bids'].items(), key=lambda x: x[1])[0]
-        
-        if time_remaining.total_seconds() <= 15 and current_highest_bidder and current_highest_bidder != ctx.author.id:
-            auction['end_time'] = datetime.now() + timedelta(seconds=15)
+        time_remaining = auction['end_monotonic'] - time.monotonic()
+        current_highest_bidder = auction['highest_bidder']
+
+        if time_remaining <= 15 and current_highest_bidder and current_highest_bidder != ctx.author.id:
+            auction['end_monotonic'] = time.monotonic() + 15
+            self.bot.schedule_auction_end(ctx.channel.id, auction, 15)
             extension_content = [
                 f"📦 **Item:** `{auction['item']}`",
                 "⏳ **Extension:** `15 seconds`"
             ]
             
-            if previous_bidder := ctx.guild.get_member(current_highest_bidder):
+            if previous_bidder := auction['bidder_objs'].get(current_highest_bidder):
                 await self.bot.send_formatted_message(previous_bidder, "⏰ AUCTION EXTENDED! ⏰", "33", extension_content)
             await self.bot.send_formatted_message(ctx.author, "⏰ AUCTION EXTENDED! ⏰", "33", extension_content)
 
         # Check if this is the highest bid before adding it
-        current_bids = auction['bids'].values()
-        is_highest = not current_bids or bid_amount > max(current_bids)
+        is_highest = bid_amount > auction['highest_bid']
 
-        # Get current highest bidder before updating
-        current_highest_bidder = None
-        if auction['bids']:
-            current_highest_bidder = max(auction['bids'].items(), key=lambda x: x[1])[0]
-
-        # Update bid and send confirmation
+        # Update bid, cached Member, and cached leader
         auction['bids'][ctx.author.id] = bid_amount
-        
-        # Send confirmation to the bidder
+        auction['bidder_objs'][ctx.author.id] = ctx.author
+        if is_highest:
+            auction['highest_bid'] = bid_amount
+            auction['highest_bidder'] = ctx.author.id
+
+        # Batch the confirmation and any outbid alert into concurrent sends
         confirm_content = [
             f"📦 **Item:** `{auction['item']}`",
             f"💰 **Your bid:** `{denomination}`",
             f"📊 **Current Status:** {'You are the highest bidder!' if is_highest else 'You have been outbid.'}"
         ]
-        await self.bot.send_formatted_message(ctx.author, "✅ BID PLACED SUCCESSFULLY! ✅", "32", confirm_content)
-        
+        sends = [self.bot.send_formatted_message(ctx.author, "✅ BID PLACED SUCCESSFULLY! ✅", "32", confirm_content)]
+
         # Notify previous highest bidder if they were outbid
         if is_highest and current_highest_bidder and current_highest_bidder != ctx.author.id:
-            if bidder := ctx.guild.get_member(current_highest_bidder):
+            if bidder := auction['bidder_objs'].get(current_highest_bidder):
                 their_bid = auction['bids'][current_highest_bidder]
                 outbid_content = [
                     f"📦 **Item:** `{auction['item']}`",
-                    f"💰 **Your bid:** `{parse_bid(str(their_bid))[1]}`",
+                    f"💰 **Your bid:** `{format_silver(their_bid)}`",
                     "📊 **Current Status:** You have been outbid!"
                 ]
-                try:
-                    await self.bot.send_formatted_message(bidder, "⚠️ OUTBID ALERT! ⚠️", "31", outbid_content)
-                except discord.Forbidden:
-                    print(f"Could not send DM to {bidder} - DMs may be disabled")
+                sends.append(self.bot.send_formatted_message(bidder, "⚠️ OUTBID ALERT! ⚠️", "31", outbid_content))
 
-def parse_bid(bid_str: str) -> tuple[int, str]:
+        await asyncio.gather(*sends, return_exceptions=True)
+
+def parse_bid(bid_str: str) -> tuple[int, str] | None:
     """Parse bid string into total silver amount and formatted display string"""
     try:
-        bid_str = bid_str.lower()
-        # Handle full names and abbreviations
-        replacements = {
-            'mithril': 'm', 'mith': 'm',
-            'platinum': 'p', 'plat': 'p',
-            'gold': 'g',
-            'silver': 's', 'sil': 's'
-        }
-        for full, short in replacements.items():
-            bid_str = bid_str.replace(full, short)
-        
+        # Handle full names and abbreviations in a single pass
+        bid_str = _ALIAS_RE.sub(lambda m: _ALIASES[m.group(0)], bid_str.lower())
+
         total_silver = 0
         parts = bid_str.split()
         
@@ -318,57 +378,50 @@ def parse_bid(bid_str: str) -> tuple[int, str]:
         last_currency_index = -1
         
         for part in parts:
-            if not (match := re.match(r'^(\d+)([mgps])$', part)):
-                return None, None
-                
+            if not (match := _BID_RE.match(part)):
+                return None
+
             amount, unit = match.groups()
             current_index = valid_order.index(unit)
-            
+
             # Check if currencies are in correct order
             if current_index <= last_currency_index:
-                return None, None
+                return None
             last_currency_index = current_index
-            
-            amount = int(amount)
-            
-            multipliers = {
-                'm': 1000000,
-                'p': 10000,
-                'g': 100,
-                's': 1
-            }
-            total_silver += amount * multipliers[unit]
-        
-        # Convert total silver to mixed denominations
-        mithril = total_silver // 1000000
-        remainder = total_silver % 1000000
-        
-        platinum = remainder // 10000
-        remainder = remainder % 10000
-        
-        gold = remainder // 100
-        silver = remainder % 100
-        
-        # Build display string with only non-zero amounts
-        parts = []
-        if mithril > 0:
-            parts.append(f"{mithril}m")
-        if platinum > 0:
-            parts.append(f"{platinum}p")
-        if gold > 0:
-            parts.append(f"{gold}g")
-        if silver > 0:
-            parts.append(f"{silver}s")
-        
-        display = " ".join(parts) if parts else "0s"
-        
-        return total_silver, display
+
+            total_silver += int(amount) * _MULTIPLIERS[unit]
+
+        return total_silver, format_silver(total_silver)
     except (ValueError, KeyError, AttributeError):
-        return None, None
+        return None
+
+def format_silver(total_silver: int) -> str:
+    """Format a total silver amount as a mixed-denomination display string"""
+    mithril = total_silver // 1000000
+    remainder = total_silver % 1000000
+
+    platinum = remainder // 10000
+    remainder = remainder % 10000
+
+    gold = remainder // 100
+    silver = remainder % 100
+
+    # Build display string with only non-zero amounts
+    parts = []
+    if mithril > 0:
+        parts.append(f"{mithril}m")
+    if platinum > 0:
+        parts.append(f"{platinum}p")
+    if gold > 0:
+        parts.append(f"{gold}g")
+    if silver > 0:
+        parts.append(f"{silver}s")
+
+    return " ".join(parts) if parts else "0s"
 
 def parse_duration(duration_str: str) -> timedelta:
     """Parse duration string into timedelta"""
-    if match := re.match(r'^(\d+)([mh])$', duration_str.lower()):
+    if match := _DUR_RE.match(duration_str.lower()):
         amount, unit = match.groups()
         amount = int(amount)
         return timedelta(minutes=amount) if unit == 'm' else timedelta(hours=amount)
@@ -376,6 +429,12 @@ def parse_duration(duration_str: str) -> timedelta:
 
 def main():
     """Initialize and run the bot"""
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass  # uvloop is unavailable on Windows; fall back to the stdlib loop
+
     bot = AuctionBot()
     bot.run(TOKEN)
 
@@ -1,84 +1,167 @@
+import asyncio
+import functools
+import heapq
 import discord
-from discord.ext import commands, tasks
-from datetime import datetime
+from discord.ext import commands
 import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+_SEP = "━" * 24
+
+# Rendered header blocks; the bot only ever uses a handful of headers
+_HEADER_CACHE: dict[tuple[str, str], str] = {}
+
+def _header_block(header: str, color: str) -> str:
+    """Build (and cache) the ansi header block plus leading separator"""
+    key = (header, color)
+    block = _HEADER_CACHE.get(key)
+    if block is None:
+        block = f"```ansi\n\u001b[1;{color}m{header}\u001b[0m\n```\n{_SEP}"
+        _HEADER_CACHE[key] = block
+    return block
+
+# Parsed once at import so a malformed env var fails at process start
+_RESULTS_CHANNEL_ID: int = int(os.getenv('AUCTION_RESULTS_CHANNEL_ID') or 0)
+
+def retry_with_backoff(max_attempts=3, base=0.5, cap=5.0):
+    """Retry transient Discord HTTP failures (429/5xx) with exponential backoff
+
+    discord.Forbidden is deliberately not retried - closed DMs and missing
+    permissions don't fix themselves on the next attempt.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            for attempt in range(max_attempts):
+                try:
+                    return await func(*args, **kwargs)
+                except discord.Forbidden:
+                    raise
+                except discord.HTTPException as e:
+                    if e.status != 429 and e.status < 500:
+                        raise
+                    if attempt == max_attempts - 1:
+                        raise
+                    await asyncio.sleep(min(cap, base * 2 ** attempt))
+        return wrapper
+    return decorator
 
 class AuctionBot(commands.Bot):
     def __init__(self):
         intents = discord.Intents.default()
         intents.message_content = True
         intents.members = True  # Enable member intent to get member objects
-        print(f"🤖 Bot starting with intents enabled: message_content={intents.message_content}, members={intents.members}")
+        logger.info("🤖 Bot starting with intents enabled: message_content=%s, members=%s", intents.message_content, intents.members)
         super().__init__(command_prefix='!', intents=intents)
         self.active_auctions = {}
-        self.results_channel_id = int(os.getenv('AUCTION_RESULTS_CHANNEL_ID', 0))
+        self.results_channel_id = _RESULTS_CHANNEL_ID
+        self._wake = None
+        self._worker_task = None  # Runs only while auctions are live
+        self._deadline_heap = []  # (end_time, channel_id), pruned lazily
+        self._send_sem = asyncio.Semaphore(8)  # Cap concurrent outbound API calls
+        self._dm_cache: dict[int, discord.DMChannel] = {}
+        self._results_channels: dict[int, discord.TextChannel] = {}
+        self._bg_tasks: set = set()  # Keeps fire-and-forget tasks alive until done
 
     async def setup_hook(self):
         """Initialize bot settings and start background tasks"""
-        print("🎮 Setting up bot hooks and background tasks")
-        self.check_auctions.start()
+        logger.info("🎮 Setting up bot hooks and background tasks")
+        self._wake = asyncio.Event()  # Created here so it binds to the running loop
+
+    def _ensure_auction_worker(self):
+        """Start the deadline worker if it isn't already running"""
+        if self._worker_task is None or self._worker_task.done():
+            self._worker_task = self.loop.create_task(self._auction_worker())
 
     async def on_ready(self):
         """Called when the bot is ready to start receiving events"""
-        print(f"✅ Bot is ready! Logged in as {self.user} (ID: {self.user.id})")
-        print(f"📚 Using discord.py version: {discord.__version__}")
-        print(f"👥 Member intent enabled: {self.intents.members}")
-        print(f"📝 Message content intent enabled: {self.intents.message_content}")
-
-    @tasks.loop(seconds=1.0)
-    async def check_auctions(self):
-        """Check for ended auctions and process them"""
-        current_time = datetime.now()
-        ended_auctions = [(channel_id, auction) 
-                         for channel_id, auction in list(self.active_auctions.items())
-                         if current_time >= auction['end_time']]
-        
-        for channel_id, auction in ended_auctions:
-            if channel_id in self.active_auctions:
-                print(f"🔄 Processing ended auction: {auction['item']} in channel {channel_id}")
-                await self.process_auction_end(channel_id, auction)
+        logger.info("✅ Bot is ready! Logged in as %s (ID: %s)", self.user, self.user.id)
+        logger.info("📚 Using discord.py version: %s", discord.__version__)
+        logger.info("👥 Member intent enabled: %s", self.intents.members)
+        logger.info("📝 Message content intent enabled: %s", self.intents.message_content)
+
+    async def _auction_worker(self):
+        """Sleep until the earliest auction deadline and process due auctions
+
+        Exits once no auctions remain; start_auction restarts it via
+        _ensure_auction_worker and sets the wake event whenever a new deadline
+        may be earlier than the one we are sleeping towards.
+        """
+        while True:
+            if not self.active_auctions:
+                return
+
+            # Drop stale heap entries left behind by finished or rescheduled
+            # auctions (lazy deletion keeps pushes O(log N) with no fix-ups)
+            while self._deadline_heap:
+                end_time, channel_id = self._deadline_heap[0]
+                auction = self.active_auctions.get(channel_id)
+                if auction is None or auction['end_time'] != end_time:
+                    heapq.heappop(self._deadline_heap)
+                else:
+                    break
+
+            if not self._deadline_heap:
+                continue
+
+            next_deadline = self._deadline_heap[0][0]
+            delay = max(0, next_deadline - self.loop.time())
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=delay)
+                self._wake.clear()
+            except asyncio.TimeoutError:
+                pass
+
+            now = self.loop.time()
+            while self._deadline_heap and self._deadline_heap[0][0] <= now:
+                end_time, channel_id = heapq.heappop(self._deadline_heap)
+                auction = self.active_auctions.get(channel_id)
+                if auction is None or auction['end_time'] != end_time:
+                    continue  # Stale entry from a finished or rescheduled auction
                 del self.active_auctions[channel_id]
+                logger.debug("🔄 Processing ended auction: %s in channel %s", auction['item'], channel_id)
+                await self.process_auction_end(channel_id, auction)
 
     async def process_auction_end(self, channel_id: int, auction: dict):
         """Process an ended auction and announce results"""
-        print(f"🏁 Ending auction for {auction['item']} in channel {channel_id}")
+        logger.debug("🏁 Ending auction for %s in channel %s", auction['item'], channel_id)
         if channel := self.get_channel(channel_id):
-            if not auction['bids']:
-                print(f"📭 No bids received for {auction['item']}")
+            # Key off the cached leader, not the bidders array: a zero-amount
+            # bid is recorded but never takes the lead
+            if auction['top_bidder'] is None:
+                logger.debug("📭 No bids received for %s", auction['item'])
                 await self.send_no_bids_message(channel, auction['item'])
                 return
                 
-            winner_id, winning_bid = max(auction['bids'].items(), key=lambda x: x[1])
+            winner_id, winning_bid = auction['top_bidder'], auction['top_bid']
             if winner := channel.guild.get_member(winner_id):
-                print(f"🏆 Winner found: {winner.name} with bid of {winning_bid}")
+                logger.debug("🏆 Winner found: %s with bid of %s", winner.name, winning_bid)
                 await self.send_winner_messages(channel, auction['item'], winner, winning_bid)
 
     async def send_no_bids_message(self, channel, item: str):
         """Send message for auction with no bids"""
-        print(f"📢 Sending no bids message for {item}")
+        logger.debug("📢 Sending no bids message for %s", item)
         content = [
             f"📦 **Item:** `{item}`",
             "❌ **Result:** No bids were placed."
         ]
-        await self.send_formatted_message(channel, "🏁 AUCTION ENDED! 🏁", "31", content)
-        
-        if results_channel := channel.guild.get_channel(self.results_channel_id):
-            await self.send_formatted_message(results_channel, "🏁 AUCTION ENDED! 🏁", "31", content)
+        sends = [self.send_formatted_message(channel, "🏁 AUCTION ENDED! 🏁", "31", content)]
+
+        if results_channel := self._results_channel_for(channel.guild):
+            sends.append(self.send_formatted_message(results_channel, "🏁 AUCTION ENDED! 🏁", "31", content))
+
+        await asyncio.gather(*sends, return_exceptions=True)
 
     async def send_winner_messages(self, channel, item: str, winner: discord.Member, winning_bid):
         """Send winner announcement messages"""
-        print(f"🎉 Sending winner messages for {item}")
+        logger.debug("🎉 Sending winner messages for %s", item)
         # Public channel message (without bid amount)
         public_content = [
             f"📦 **Item:** `{item}`",
             f"👑 **Winner:** `{winner.display_name}`"
         ]
-        await self.send_formatted_message(channel, "🎉 AUCTION ENDED! 🎉", "32", public_content)
-
-        # Results channel message (with bid amount)
-        if results_channel := channel.guild.get_channel(self.results_channel_id):
-            results_content = public_content + [f"💰 **Winning Bid:** `{winning_bid}`"]
-            await self.send_formatted_message(results_channel, "🎉 AUCTION ENDED! 🎉", "32", results_content)
 
         # Winner DM
         winner_content = [
@@ -86,14 +169,23 @@ class AuctionBot(commands.Bot):
             f"📦 **Item:** `{item}`",
             f"💰 **Your winning bid:** `{winning_bid}`"
         ]
-        await self.send_formatted_message(winner, "🎊 CONGRATULATIONS! 🎊", "33", winner_content)
 
-    async def send_bid_confirmation(self, destination, item: str, bid_amount: int, denomination: str, channel_id: int):
+        sends = [
+            self.send_formatted_message(channel, "🎉 AUCTION ENDED! 🎉", "32", public_content),
+            self.send_formatted_message(winner, "🎊 CONGRATULATIONS! 🎊", "33", winner_content)
+        ]
+
+        # Results channel message (with bid amount)
+        if results_channel := self._results_channel_for(channel.guild):
+            results_content = public_content + [f"💰 **Winning Bid:** `{winning_bid}`"]
+            sends.append(self.send_formatted_message(results_channel, "🎉 AUCTION ENDED! 🎉", "32", results_content))
+
+        # A failed DM must not block the public announcements
+        await asyncio.gather(*sends, return_exceptions=True)
+
+    async def send_bid_confirmation(self, destination, item: str, denomination: str, is_highest: bool):
         """Send bid confirmation message"""
-        print(f"📨 Sending bid confirmation to {destination}")
-        current_bids = self.active_auctions[channel_id]['bids'].values()
-        is_highest = not current_bids or bid_amount > max(current_bids)
-        
+        logger.debug("📨 Sending bid confirmation to %s", destination)
         confirm_content = [
             f"📦 **Item:** `{item}`",
             f"💰 **Your bid:** `{denomination}`",
@@ -107,33 +199,58 @@ class AuctionBot(commands.Bot):
             except:
                 pass
 
+    def _results_channel_for(self, guild) -> discord.TextChannel:
+        """Resolve and cache the results channel for a guild"""
+        results_channel = self._results_channels.get(guild.id)
+        if results_channel is None and self.results_channel_id:
+            results_channel = guild.get_channel(self.results_channel_id)
+            self._results_channels[guild.id] = results_channel
+        return results_channel
+
+    async def on_guild_channel_delete(self, channel):
+        """Invalidate the cached results channel if it was just deleted"""
+        if self._results_channels.get(channel.guild.id) is channel:
+            del self._results_channels[channel.guild.id]
+
+    async def _dm_for(self, member: discord.Member) -> discord.DMChannel:
+        """Get the member's DM channel, creating and caching it on first use"""
+        dm_channel = self._dm_cache.get(member.id)
+        if dm_channel is None:
+            dm_channel = await member.create_dm()
+            self._dm_cache[member.id] = dm_channel
+        return dm_channel
+
+    @retry_with_backoff()
+    async def _send_raw(self, destination, payload: str):
+        """Send a payload under the concurrency cap, retrying transient failures"""
+        async with self._send_sem:
+            return await destination.send(payload)
+
     async def send_formatted_message(self, destination, header: str, header_color: str, content: list, footer: list = None):
         """Send a formatted message with consistent styling"""
         try:
             if isinstance(destination, discord.Member):
-                print(f"📨 Attempting to send DM to: {destination.name} (ID: {destination.id})")
-                dm_channel = await destination.create_dm()
-                print(f"📬 DM channel created for {destination.name}")
+                logger.debug("📨 Attempting to send DM to: %s (ID: %s)", destination.name, destination.id)
+                dm_channel = await self._dm_for(destination)
+                logger.debug("📬 DM channel ready for %s", destination.name)
                 destination = dm_channel  # Use the DM channel instead of the member object
             
-            message = [
-                "```ansi",
-                f"\u001b[1;{header_color}m{header}\u001b[0m",
-                "```",
-                "━━━━━━━━━━━━━━━━━━━━━━━━"
-            ]
-            message.extend(content)
-            message.append("━━━━━━━━━━━━━━━━━━━━━━━━")
-            if footer:
-                message.extend(footer)
-            
-            sent_message = await destination.send('\n'.join(message))
+            body = content if isinstance(content, str) else '\n'.join(content)
+            footer_str = ('\n' + '\n'.join(footer)) if footer else ''
+            payload = f"{_header_block(header, header_color)}\n{body}\n{_SEP}{footer_str}"
+
+            sent_message = await self._send_raw(destination, payload)
             if isinstance(destination, discord.DMChannel):
-                print(f"✅ Successfully sent DM to {destination.recipient.name}")
+                logger.debug("✅ Successfully sent DM to %s", destination.recipient.name)
             return sent_message
-        except discord.Forbidden as e:
-            print(f"❌ ERROR: Cannot send message to {destination}: No permission")
+        except discord.Forbidden:
+            logger.warning("❌ Cannot send message to %s: no permission", destination)
+            raise
+        except discord.NotFound:
+            # Stale cached DM channel - evict so the next send recreates it
+            if isinstance(destination, discord.DMChannel) and destination.recipient:
+                self._dm_cache.pop(destination.recipient.id, None)
             raise
         except Exception as e:
-            print(f"❌ ERROR: Failed to send message to {destination}: {str(e)}")
+            logger.error("❌ Failed to send message to %s: %s", destination, e)
             raise
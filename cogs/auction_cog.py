@@ -1,29 +1,89 @@
+import heapq
+import re
 import discord
 from discord.ext import commands
-from datetime import datetime, timedelta
-from ..utils.bid_parser import parse_bid
+from ..utils.bid_parser import parse_bid, format_silver
 from ..utils.time_parser import parse_duration
 import logging
 
+logger = logging.getLogger(__name__)
+
+# One-pass detector for bid-looking messages that must be deleted from
+# silent-auction channels
+_BID_SNIFFER = re.compile(r'^!bid\b|plat|gold|silver|mith|\d+[pgsm]\b', re.IGNORECASE)
+
+# Pre-rendered message bodies; only item and duration vary per auction
+_AUCTION_START_TEMPLATE = (
+    "📦 **Item:** `{item}`\n"
+    "⏳ **Duration:** `{duration}`\n"
+    "\n"
+    "**💰 How to Bid:**\n"
+    "Type `!bid` followed by your amount:\n"
+    "\n"
+    "**Mithril**\n"
+    "• `!bid 1m` or `1mith` or `1mithril`\n"
+    "\n"
+    "**Platinum**\n"
+    "• `!bid 50p` or `50plat` or `50platinum`\n"
+    "\n"
+    "**Gold**\n"
+    "• `!bid 100g` or `100gold`\n"
+    "\n"
+    "**Silver**\n"
+    "• `!bid 500s` or `500sil` or `500silver`\n"
+    "\n"
+    "**Mix Currencies:**\n"
+    "• `!bid 1m 50p 100g 500s`\n"
+    "\n"
+    "**🔔 Rules:**\n"
+    "• Silent auction - bids are private\n"
+    "• Bid confirmations sent via DM\n"
+    "• 15s extension when outbid"
+)
+
+_INVALID_BID_MESSAGE = (
+    "❌ **Invalid bid format!**\n"
+    "\n"
+    "**Correct formats:**\n"
+    "• Mithril: `1m` or `1mith` or `1mithril`\n"
+    "• Platinum: `50p` or `50plat` or `50platinum`\n"
+    "• Gold: `100g` or `100gold`\n"
+    "• Silver: `500s` or `500sil` or `500silver`\n"
+    "\n"
+    "**Mix currencies (must be in this order):**\n"
+    "• `!bid 1m 50p 100g 500s`\n"
+    "\n"
+    "**Common mistakes:**\n"
+    "• Wrong order (e.g., `!bid 100g 1m`)\n"
+    "• Invalid currency\n"
+    "• Missing amount (e.g., `!bid m`)\n"
+    "• Extra spaces or symbols"
+)
+
 
 class Auction(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        print("🎪 Auction cog initialized")
+        logger.info("🎪 Auction cog initialized")
 
     @commands.Cog.listener()
     async def on_message(self, message):
         """Delete any messages that look like bids to maintain auction privacy"""
-        if message.author.bot or message.channel.id not in self.bot.active_auctions:
+        # Probe the auction map first: most traffic is in non-auction channels
+        # (bind the dict locally to avoid repeated attribute hops)
+        active = self.bot.active_auctions
+        if not active or message.channel.id not in active:
+            return
+
+        if message.author.id == self.bot.user.id or message.guild is None:
             return
 
-        content = message.content.lower()
-        if content.startswith('!bid') or any(x in content for x in ['p ', 'g ', 's ', 'm ', 'plat', 'gold', 'silver', 'mith']):
+        if _BID_SNIFFER.search(message.content):
             try:
                 await message.delete()
-                print(f"🗑️ Deleted bid message from {message.author.name}")
+                logger.debug("🗑️ Deleted bid message from %s", message.author.name)
             except (discord.Forbidden, discord.NotFound) as e:
-                print(f"❌ Failed to delete bid message: {e}")
+                logger.warning("❌ Failed to delete bid message: %s", e)
 
     @commands.command(name='auction')
     async def start_auction(self, ctx, item: str, duration: str):
@@ -41,110 +101,86 @@ class Auction(commands.Cog):
             await ctx.author.send("❌ Invalid duration format. Use: `5m` for 5 minutes or `2h` for 2 hours")
             return
 
-        end_time = datetime.now() + max(duration_delta, timedelta(seconds=10))
-        
+        # Monotonic loop-time deadline: immune to wall-clock jumps and cheap to compare
+        end_time = self.bot.loop.time() + max(duration_delta.total_seconds(), 10.0)
+
         self.bot.active_auctions[ctx.channel.id] = {
             'item': item,
             'end_time': end_time,
-            'bids': {}
+            # Parallel bidder/amount arrays with an id -> slot index map;
+            # the cached top_bid/top_bidder make per-bid scans unnecessary
+            'bidders': [],
+            'amounts': [],
+            'bidder_index': {},
+            'top_bid': 0,
+            'top_bidder': None
         }
+        heapq.heappush(self.bot._deadline_heap, (end_time, ctx.channel.id))
+        self.bot._ensure_auction_worker()
+        self.bot._wake.set()  # New deadline may be earlier than the worker's current sleep
 
-        content = [
-            f"📦 **Item:** `{item}`",
-            f"⏳ **Duration:** `{duration}`",
-            "",
-            "**💰 How to Bid:**",
-            "Type `!bid` followed by your amount:",
-            "",
-            "**Mithril**",
-            "• `!bid 1m` or `1mith` or `1mithril`",
-            "",
-            "**Platinum**",
-            "• `!bid 50p` or `50plat` or `50platinum`",
-            "",
-            "**Gold**",
-            "• `!bid 100g` or `100gold`",
-            "",
-            "**Silver**",
-            "• `!bid 500s` or `500sil` or `500silver`",
-            "",
-            "**Mix Currencies:**",
-            "• `!bid 1m 50p 100g 500s`",
-            "",
-            "**🔔 Rules:**",
-            "• Silent auction - bids are private",
-            "• Bid confirmations sent via DM",
-            "• 15s extension when outbid"
-        ]
-        
+        content = _AUCTION_START_TEMPLATE.format(item=item, duration=duration)
         await self.bot.send_formatted_message(ctx, "🔨 SILENT AUCTION STARTED! 🔨", "33", content)
 
     @commands.command(name='bid')
     async def place_bid(self, ctx, *, bid: str):
         """Place a bid in the current auction"""
-        print(f"💰 New bid from {ctx.author.name} (ID: {ctx.author.id})")
-        print(f"📝 Bid content: {bid}")
+        logger.debug("💰 New bid from %s (ID: %s): %s", ctx.author.name, ctx.author.id, bid)
 
         try:
             await ctx.message.delete()
         except (discord.Forbidden, discord.NotFound) as e:
-            print(f"❌ Failed to delete bid command: {e}")
+            logger.warning("❌ Failed to delete bid command: %s", e)
 
         if ctx.channel.id not in self.bot.active_auctions:
-            print(f"⚠️ No active auction in channel {ctx.channel.name}")
+            logger.debug("⚠️ No active auction in channel %s", ctx.channel.name)
             await ctx.author.send("❌ No active auction in this channel!")
             return
 
         auction = self.bot.active_auctions[ctx.channel.id]
-        print(f"🎯 Processing bid for auction: {auction['item']}")
+        logger.debug("🎯 Processing bid for auction: %s", auction['item'])
 
-        if datetime.now() >= auction['end_time']:
-            print(f"⚠️ Late bid attempt from {ctx.author.name}")
+        if self.bot.loop.time() >= auction['end_time']:
+            logger.debug("⚠️ Late bid attempt from %s", ctx.author.name)
             await ctx.author.send("❌ This auction has ended!")
             return
 
         # Validate bid format and parse amount
         if not (result := parse_bid(bid)):
-            print(f"⚠️ Invalid bid format from {ctx.author.name}: {bid}")
-            error_content = [
-                "❌ **Invalid bid format!**",
-                "",
-                "**Correct formats:**",
-                "• Mithril: `1m` or `1mith` or `1mithril`",
-                "• Platinum: `50p` or `50plat` or `50platinum`",
-                "• Gold: `100g` or `100gold`",
-                "• Silver: `500s` or `500sil` or `500silver`",
-                "",
-                "**Mix currencies (must be in this order):**",
-                "• `!bid 1m 50p 100g 500s`",
-                "",
-                "**Common mistakes:**",
-                "• Wrong order (e.g., `!bid 100g 1m`)",
-                "• Invalid currency",
-                "• Missing amount (e.g., `!bid m`)",
-                "• Extra spaces or symbols"
-            ]
-            await self.bot.send_formatted_message(ctx.author, "❌ INCORRECT BID FORMAT! ❌", "31", error_content)
+            logger.debug("⚠️ Invalid bid format from %s: %s", ctx.author.name, bid)
+            await self.bot.send_formatted_message(ctx.author, "❌ INCORRECT BID FORMAT! ❌", "31", _INVALID_BID_MESSAGE)
             return
 
         bid_amount, denomination = result
-        print(f"💎 Parsed bid: {bid_amount} ({denomination})")
-
-        # Check if this is the highest bid
-        current_bids = auction['bids'].values()
-        is_highest = not current_bids or bid_amount > max(current_bids)
-        print(f"👑 Bid is highest: {is_highest}")
-
-        # Get current highest bidder before updating
-        current_highest_bidder = None
-        if auction['bids']:
-            current_highest = max(auction['bids'].items(), key=lambda x: x[1])
-            current_highest_bidder = current_highest[0]
-            print(f"📊 Current highest bidder ID: {current_highest_bidder}, Amount: {current_highest[1]}")
-
-        # Update bid
-        auction['bids'][ctx.author.id] = bid_amount
-        print(f"✅ Updated auction bids. New bid from {ctx.author.name}: {bid_amount}")
+        logger.debug("💎 Parsed bid: %s (%s)", bid_amount, denomination)
+
+        # Consult the cached leader instead of scanning every bid
+        is_highest = bid_amount > auction['top_bid']
+        logger.debug("👑 Bid is highest: %s", is_highest)
+
+        current_highest_bidder = auction['top_bidder']
+        if current_highest_bidder is not None:
+            logger.debug("📊 Current highest bidder ID: %s, Amount: %s", current_highest_bidder, auction['top_bid'])
+
+        # Update bid and cached leader
+        idx = auction['bidder_index'].get(ctx.author.id)
+        if idx is None:
+            auction['bidder_index'][ctx.author.id] = len(auction['bidders'])
+            auction['bidders'].append(ctx.author.id)
+            auction['amounts'].append(bid_amount)
+        else:
+            auction['amounts'][idx] = bid_amount
+        if is_highest:
+            auction['top_bid'] = bid_amount
+            auction['top_bidder'] = ctx.author.id
+        elif ctx.author.id == auction['top_bidder']:
+            # The leader lowered their own standing bid, so the cached max is
+            # stale; recompute it over the amounts array
+            amounts = auction['amounts']
+            top_idx = max(range(len(amounts)), key=amounts.__getitem__)
+            auction['top_bid'] = amounts[top_idx]
+            auction['top_bidder'] = auction['bidders'][top_idx]
+        logger.debug("✅ Updated auction bids. New bid from %s: %s", ctx.author.name, bid_amount)
         
         # Send confirmation to the bidder
         try:
@@ -154,48 +190,56 @@ class Auction(commands.Cog):
                 f"📊 **Current Status:** {'You are the highest bidder!' if is_highest else 'You have been outbid.'}"
             ]
             await self.bot.send_formatted_message(ctx.author, "✅ BID PLACED SUCCESSFULLY! ✅", "32", confirm_content)
-            print(f"📨 Sent bid confirmation to {ctx.author.name}")
+            logger.debug("📨 Sent bid confirmation to %s", ctx.author.name)
         except Exception as e:
-            print(f"❌ Failed to send bid confirmation to {ctx.author.name}: {e}")
+            logger.warning("❌ Failed to send bid confirmation to %s: %s", ctx.author.name, e)
         
         # Notify previous highest bidder if they were outbid
         if is_highest and current_highest_bidder and current_highest_bidder != ctx.author.id:
-            print(f"📢 Attempting to notify outbid user (ID: {current_highest_bidder})")
+            logger.debug("📢 Attempting to notify outbid user (ID: %s)", current_highest_bidder)
             
             if bidder := ctx.guild.get_member(current_highest_bidder):
-                print(f"👤 Found member object for outbid user: {bidder.name}")
-                their_bid = auction['bids'][current_highest_bidder]
+                logger.debug("👤 Found member object for outbid user: %s", bidder.name)
+                their_bid = auction['amounts'][auction['bidder_index'][current_highest_bidder]]
                 
                 outbid_content = [
                     "⚠️ **OUTBID ALERT!** ⚠️",
                     "━━━━━━━━━━━━━━━━━━━━━━━━",
                     f"📦 **Item:** `{auction['item']}`",
-                    f"💰 **Your bid:** `{parse_bid(str(their_bid))[1]}`",
+                    f"💰 **Your bid:** `{format_silver(their_bid)}`",
                     "📊 **Current Status:** You have been outbid!",
                     "",
                     "💡 **Quick Tip:** Place a new bid to stay in the auction!",
                     f"Channel: {ctx.channel.mention}"
                 ]
-                
-                try:
-                    dm_channel = await bidder.create_dm()
-                    print(f"📨 Created DM channel for {bidder.name}")
-                    
-                    await dm_channel.send('\n'.join(outbid_content))
-                    print(f"✅ Successfully sent outbid notification to {bidder.name}")
-                    
-                except discord.Forbidden as e:
-                    print(f"❌ Forbidden error sending DM to {bidder.name}: {e}")
-                    try:
-                        await ctx.channel.send(
-                            f"⚠️ {bidder.mention} I couldn't send you a DM! Please enable DMs to receive outbid notifications.", 
-                            delete_after=10
-                        )
-                        print(f"📢 Sent channel notification about DM failure to {bidder.name}")
-                    except Exception as e:
-                        print(f"❌ Failed to send channel notification: {e}")
-                
-                except Exception as e:
-                    print(f"❌ Unexpected error sending outbid notification to {bidder.name}: {e}")
+
+                # Fire-and-forget: the outbid DM must not delay returning
+                # control to the bid handler
+                task = self.bot.loop.create_task(self._notify_outbid(ctx, bidder, outbid_content))
+                self.bot._bg_tasks.add(task)
+                task.add_done_callback(self.bot._bg_tasks.discard)
             else:
-                print(f"❌ Could not find member object for outbid user ID: {current_highest_bidder}")
+                logger.debug("❌ Could not find member object for outbid user ID: %s", current_highest_bidder)
+
+    async def _notify_outbid(self, ctx, bidder, outbid_content):
+        """Deliver an outbid DM, falling back to a channel ping when DMs are closed"""
+        try:
+            dm_channel = await self.bot._dm_for(bidder)
+            logger.debug("📨 DM channel ready for %s", bidder.name)
+
+            await dm_channel.send('\n'.join(outbid_content))
+            logger.debug("✅ Successfully sent outbid notification to %s", bidder.name)
+
+        except discord.Forbidden as e:
+            logger.warning("❌ Forbidden error sending DM to %s: %s", bidder.name, e)
+            try:
+                await ctx.channel.send(
+                    f"⚠️ {bidder.mention} I couldn't send you a DM! Please enable DMs to receive outbid notifications.",
+                    delete_after=10
+                )
+                logger.debug("📢 Sent channel notification about DM failure to %s", bidder.name)
+            except Exception as e:
+                logger.warning("❌ Failed to send channel notification: %s", e)
+
+        except Exception as e:
+            logger.error("❌ Unexpected error sending outbid notification to %s: %s", bidder.name, e)
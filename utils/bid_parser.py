@@ -1,71 +1,67 @@
 import re
 
-def parse_bid(bid_str: str) -> tuple[int, str]:
+# Precompiled pattern and currency tables for the hot !bid path
+_BID_PART = re.compile(r'^(\d+)([mgps])$')
+
+# Full names and abbreviations, longest-first so e.g. 'mith' can't
+# swallow the start of 'mithril'
+_LONG2SHORT = {
+    'mithril': 'm', 'mith': 'm',
+    'platinum': 'p', 'plat': 'p',
+    'gold': 'g',
+    'silver': 's', 'sil': 's'
+}
+_ALIAS_RE = re.compile('|'.join(sorted(_LONG2SHORT, key=len, reverse=True)))
+
+# Silver value of one unit of each denomination
+_MULT = {'m': 1_000_000, 'p': 10_000, 'g': 100, 's': 1}
+
+# Required ordering of denominations within a bid
+_UNIT_ORDER = {'m': 0, 'p': 1, 'g': 2, 's': 3}
+
+def parse_bid(bid_str: str) -> tuple[int, str] | None:
     """Parse bid string into total silver amount and formatted display string"""
     try:
-        bid_str = bid_str.lower()
-        # Handle full names and abbreviations
-        replacements = {
-            'mithril': 'm', 'mith': 'm',
-            'platinum': 'p', 'plat': 'p',
-            'gold': 'g',
-            'silver': 's', 'sil': 's'
-        }
-        for full, short in replacements.items():
-            bid_str = bid_str.replace(full, short)
-        
+        # Normalize full names and abbreviations in a single pass
+        bid_str = _ALIAS_RE.sub(lambda m: _LONG2SHORT[m.group(0)], bid_str.lower())
+
         total_silver = 0
-        parts = bid_str.split()
-        
-        # Validate currency order
-        valid_order = ['m', 'p', 'g', 's']
         last_currency_index = -1
-        
-        for part in parts:
-            if not (match := re.match(r'^(\d+)([mgps])$', part)):
-                return None, None
-                
+
+        for part in bid_str.split():
+            if not (match := _BID_PART.match(part)):
+                return None
+
             amount, unit = match.groups()
-            current_index = valid_order.index(unit)
-            
+            current_index = _UNIT_ORDER[unit]
+
             # Check if currencies are in correct order
             if current_index <= last_currency_index:
-                return None, None
+                return None
             last_currency_index = current_index
-            
-            amount = int(amount)
-            
-            multipliers = {
-                'm': 1000000,
-                'p': 10000,
-                'g': 100,
-                's': 1
-            }
-            total_silver += amount * multipliers[unit]
-        
-        # Convert total silver to mixed denominations
-        mithril = total_silver // 1000000
-        remainder = total_silver % 1000000
-        
-        platinum = remainder // 10000
-        remainder = remainder % 10000
-        
-        gold = remainder // 100
-        silver = remainder % 100
-        
-        # Build display string with only non-zero amounts
-        parts = []
-        if mithril > 0:
-            parts.append(f"{mithril}m")
-        if platinum > 0:
-            parts.append(f"{platinum}p")
-        if gold > 0:
-            parts.append(f"{gold}g")
-        if silver > 0:
-            parts.append(f"{silver}s")
-        
-        display = " ".join(parts) if parts else "0s"
-        
-        return total_silver, display
+
+            total_silver += int(amount) * _MULT[unit]
+
+        return total_silver, format_silver(total_silver)
     except (ValueError, KeyError, AttributeError):
-        return None, None
+        return None
+
+def format_silver(total_silver: int) -> str:
+    """Format a total silver amount as a mixed-denomination display string"""
+    # Convert total silver to mixed denominations
+    mithril, remainder = divmod(total_silver, 1_000_000)
+    platinum, remainder = divmod(remainder, 10_000)
+    gold, silver = divmod(remainder, 100)
+
+    # Build display string with only non-zero amounts
+    parts = []
+    if mithril > 0:
+        parts.append(f"{mithril}m")
+    if platinum > 0:
+        parts.append(f"{platinum}p")
+    if gold > 0:
+        parts.append(f"{gold}g")
+    if silver > 0:
+        parts.append(f"{silver}s")
+
+    return " ".join(parts) if parts else "0s"
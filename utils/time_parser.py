@@ -1,15 +1,15 @@
-import re
 from datetime import timedelta
 
 def parse_duration(duration_str: str) -> timedelta:
     """Parse duration string into timedelta"""
-    if match := re.match(r'^(\d+)([mh])$', duration_str.lower()):
-        amount, unit = match.groups()
-        amount = int(amount)
-        
-        if unit == 'm':
-            return timedelta(minutes=amount)
-        elif unit == 'h':
-            return timedelta(hours=amount)
-    
-    return None
+    s = duration_str.lower().strip()
+    if len(s) < 2:
+        return None
+
+    unit = s[-1]
+    num = s[:-1]
+    if unit not in ('m', 'h') or not num.isdigit():
+        return None
+
+    amount = int(num)
+    return timedelta(minutes=amount) if unit == 'm' else timedelta(hours=amount)